@@ -33,6 +33,7 @@ def register(*components):
 
 from .env import (
     cache_location,
+    cache_max_size,
     dataset_path,
     get_scratch,
     runner_path,
@@ -42,7 +43,7 @@ from .env import (
 )
 
 from .engine.cache import Caches
-caches = Caches(location=cache_location)
+caches = Caches(location=cache_location, max_size=cache_max_size)
 
 from .engine.data import Data
 register(Data)
@@ -50,7 +51,7 @@ register(Data)
 from .utility import convert, unconvert, charges_to_elements, OptimizerLGS
 register(OptimizerLGS)
 
-from .dataset import Dataset, Subset, load_dataset
+from .dataset import Dataset, Subset, load_dataset, load_datasets
 register(Dataset, Subset)
 
 from .tune import components as components_tune
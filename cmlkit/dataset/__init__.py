@@ -1,4 +1,4 @@
 """Dataset infrastructure."""
 
 from .dataset import Dataset, Subset
-from .dataset_loader import load_dataset
+from .dataset_loader import load_dataset, load_datasets
@@ -1,11 +1,15 @@
 """Dataset and Subset classes."""
 
+import sys
 from pathlib import Path
 import numpy as np
 from ase import Atoms
+from joblib import Parallel, delayed
 
 from cmlkit.engine import compute_hash, Configurable, save_npy
-from cmlkit.utility import convert, import_qmmlpack, charges_to_elements
+from cmlkit.utility import convert, charges_to_elements
+
+from .storage import to_object_array, write_dataset_npz
 
 # Yes, this is a bit of a nightmare -- it is really a very very overloaded class.
 # Note that we're using the Configurable infrastructure here, but it really is
@@ -38,8 +42,9 @@ class Dataset(Configurable):
 
     Currently, no type checking is performed. Also, it should be noted that storing
     `r` or `z` as `object`-type arrays is not particularly efficient, but simple --
-    in the future, we will most likely transition to a linearised array model, which
-    allows us to store everything contiguous in memory.
+    for bulk operations, linearised versions, in which all systems are concatenated
+    into one contiguous array, are available as `z_flat` and `r_flat`, with `offsets`
+    marking where each system starts. These are computed when first needed.
 
     In addition to geometries, a Dataset can also contain *properties*, which are the
     quantities that we're trying to build models for. They are stored in the attribute `p`.
@@ -64,7 +69,9 @@ class Dataset(Configurable):
 
     ***
 
-    Datasets are saved to disk as `.npy` files, the filename should be the name of the dataset.
+    Datasets are saved to disk as `.npz` files with flat arrays, the filename should be
+    the name of the dataset. With `protocol=1`, they are instead saved as pickled `.npy` files,
+    which was the only format in earlier versions.
 
     They can be loaded using the `load_dataset` method supplied by `cmlkit`, which looks
     for `Datasets` in an environment variable called `CML_DATASET_PATH` and the `cwd`.
@@ -89,6 +96,10 @@ class Dataset(Configurable):
         geom_hash: Like hash, but also ignoring properties.
         report: String with a report on this dataset and its statistics.
         info: Dict with various properties of this dataset.
+        counts: Number of atoms per system.
+        offsets: Start of each system in z_flat and r_flat (plus the total number of atoms).
+        z_flat: All atomic charges, concatenated.
+        r_flat: All atomic positions, concatenated into a (total_atoms, 3) array.
 
     Methods:
         pp: Properties per X.
@@ -111,28 +122,38 @@ class Dataset(Configurable):
         _info=None,
         _hash=None,
         _geom_hash=None,
+        _validate=True,
     ):
         super().__init__()
 
-        # Sanity checks
-        assert len(z) == len(
-            r
-        ), "Attempted to create dataset, but z and r are not of the same size ({} vs {})!".format(
-            len(z), len(r)
-        )
-        assert b is None or len(b) == len(
-            z
-        ), "Attempted to create dataset, but z and b are not of the same size ({} vs {})!".format(
-            len(z), len(b)
-        )
+        # ragged lists are stored as object arrays, so that indexing
+        # (for instance in Subset.from_dataset) happens in numpy
+        if isinstance(z, (list, tuple)):
+            z = to_object_array(z)
+        if isinstance(r, (list, tuple)):
+            r = to_object_array(r)
+        if isinstance(b, (list, tuple)):
+            b = np.asarray(b)
+
+        # properties are kept as contiguous arrays, so they hash the same
+        # no matter how they were sliced (the hash includes the strides)
+        p = {k: np.ascontiguousarray(v) for k, v in p.items()}
+
+        # Sanity checks (can be skipped for trusted input, like
+        # datasets we saved ourselves or subsets of a valid dataset)
+        sizes = {"r": len(r), **{f"property {k}": len(v) for k, v in p.items()}}
+        if b is not None:
+            sizes["b"] = len(b)
+
+        if _validate:
+            mismatched = {k: size for k, size in sizes.items() if size != len(z)}
+            assert (
+                not mismatched
+            ), f"Attempted to create dataset, but these are not of the same size as z ({len(z)}): {mismatched}!"
+
+        # cheap, and nothing else works on an empty dataset, so always checked
         assert len(r) > 0, "Attempted to create dataset, r has 0 length!"
 
-        if p != {}:
-            for pname, values in p.items():
-                assert len(values) == len(
-                    z
-                ), f"Attempted to create dataset, but z and property {pname} are not of the same size ({len(z)} vs {len(values)})!"
-
         self.desc = desc
         self.z = z
         self.r = r
@@ -142,53 +163,58 @@ class Dataset(Configurable):
 
         if name is None:
             name = compute_hash(self.z, self.r, self.b, self.p)
-        self.name = name
+        # names and ids are compared and used as keys a lot
+        self.name = sys.intern(name) if isinstance(name, str) else name
 
         self.n = len(self.z)
 
+        # linearised geometries, see the properties below
+        self._counts = None
+        self._z_flat = None
+        self._r_flat = None
+
         # perform some consistency checks;
         # if these ever fail there Is Trouble
         # (these are supposed to only be written once and never change,
         # so if they mismatch most likely the hashing method is not as stable
         # as I thought...)
         if _hash is not None:
-            this_hash = self.get_hash()
-            assert _hash == this_hash, "Hashes of dataset are not matching!"
+            if _validate:
+                this_hash = self.get_hash()
+                assert _hash == this_hash, "Hashes of dataset are not matching!"
             self.hash = _hash
         else:
             self.hash = self.get_hash()
 
         if _geom_hash is not None:
-            this_hash = self.get_geom_hash()
-            assert _geom_hash == this_hash, "Geometry Hashes of dataset are not matching!"
+            if _validate:
+                this_hash = self.get_geom_hash()
+                assert _geom_hash == this_hash, "Geometry Hashes of dataset are not matching!"
             self.geom_hash = _geom_hash
         else:
             self.geom_hash = self.get_geom_hash()
 
-        if _info is not None:
-            self.info = _info
-        else:
-            self.info = self.get_info()
+        # computed on first access, see the info property
+        self._info = _info
 
         # compute auxiliary info that we need to convert properties
         self.aux = {}
-        n_atoms = np.array([len(zz) for zz in self.z])  # count atoms in unit cell
-        n_non_O = np.array(
-            [len(zz[zz != 8]) for zz in self.z]
-        )  # count atoms that are not Oxygen
-        n_non_H = np.array(
-            [len(zz[zz != 1]) for zz in self.z]
-        )  # count atoms that are not Hydrogen
-
-        self.aux["n_atoms"] = n_atoms
-        self.aux["n_non_O"] = n_non_O
-        self.aux["n_non_H"] = n_non_H
+        system = np.repeat(np.arange(self.n), self.counts)  # system of each atom
+
+        # count atoms in unit cell, and those that are not Oxygen/Hydrogen
+        self.aux["n_atoms"] = self.counts
+        self.aux["n_non_O"] = self.counts - np.bincount(
+            system[self.z_flat == 8], minlength=self.n
+        )
+        self.aux["n_non_H"] = self.counts - np.bincount(
+            system[self.z_flat == 1], minlength=self.n
+        )
 
         # compatibility with Data history tracking
         # to tide us over until this gets rewritten as
         # a proper Data subclass
         self.history = [f"dataset@{self.geom_hash}"]
-        self.id = self.geom_hash
+        self.id = sys.intern(self.geom_hash)
 
     def _get_config(self):
 
@@ -205,15 +231,64 @@ class Dataset(Configurable):
             "_geom_hash": self.geom_hash,
         }
 
-    def save(self, directory="", filename=None):
-        """Save to disk, defaulting to the name as filename"""
+    def save(self, directory="", filename=None, protocol=2):
+        """Save to disk, defaulting to the name as filename.
+
+        Protocol 2 stores flat arrays in an .npz file (see `storage`),
+        protocol 1 pickles the config into an .npy file.
+        """
+
+        assert protocol in (1, 2), "Datasets only support protocols 1 (.npy) and 2 (.npz)"
 
         directory = Path(directory)
 
         if filename is None:
             filename = self.name
 
-        save_npy(directory / filename, self.get_config())
+        if protocol == 1:
+            save_npy(directory / filename, self.get_config())
+        else:
+            write_dataset_npz(directory / filename, self)
+
+    @property
+    def counts(self):
+        """Number of atoms in each system."""
+        if self._counts is None:
+            self._counts = np.array([len(z) for z in self.z], dtype=int)
+
+        return self._counts
+
+    @property
+    def offsets(self):
+        """Index of the first atom of each system in the flat arrays, and the total."""
+        offsets = np.zeros(self.n + 1, dtype=int)
+        offsets[1:] = np.cumsum(self.counts)
+
+        return offsets
+
+    @property
+    def z_flat(self):
+        """Atomic charges of all systems, concatenated."""
+        if self._z_flat is None:
+            self._z_flat = np.concatenate([np.asarray(z).ravel() for z in self.z])
+
+        return self._z_flat
+
+    @property
+    def r_flat(self):
+        """Atomic positions of all systems, concatenated into one (total_atoms, 3) array."""
+        if self._r_flat is None:
+            self._r_flat = np.concatenate([np.asarray(r).reshape(-1, 3) for r in self.r])
+
+        return self._r_flat
+
+    @property
+    def info(self):
+        """Information on dataset, see `compute_dataset_info`."""
+        if self._info is None:
+            self._info = self.get_info()
+
+        return self._info
 
     def get_info(self):
         """Compute information on dataset."""
@@ -277,12 +352,8 @@ class Dataset(Configurable):
             b = None
 
         return cls(
-            z=np.array(
-                [np.array(a.get_atomic_numbers(), dtype=int) for a in atoms]
-            ),  # this will implicitly get dtype=object, UNLESS all Atoms have the same number of atoms
-            r=np.array(
-                [np.array(a.get_positions(), dtype=float) for a in atoms]
-            ),  # this will implicitly get dtype=object, UNLESS all Atoms have the same number of atoms
+            z=to_object_array([np.array(a.get_atomic_numbers(), dtype=int) for a in atoms]),
+            r=to_object_array([np.array(a.get_positions(), dtype=float) for a in atoms]),
             b=b,
             p=p,
             name=name,
@@ -422,6 +493,7 @@ class Subset(Dataset):
         _info=None,
         _hash=None,
         _geom_hash=None,
+        _validate=True,
     ):
         # you probably want to use from_dataset in 99% of cases
         super().__init__(
@@ -435,8 +507,12 @@ class Subset(Dataset):
             _info=_info,
             _hash=_hash,
             _geom_hash=_geom_hash,
+            _validate=_validate,
         )
 
+        if idx is not None:
+            idx = np.asarray(idx, dtype=np.intp)
+
         self.idx = idx
         self.parent_info = parent_info
 
@@ -444,17 +520,28 @@ class Subset(Dataset):
     def from_dataset(cls, dataset, idx, name=None, desc="", splits=[]):
         """From parent dataset, create subset."""
 
-        z = dataset.z[idx]
-        r = dataset.r[idx]
+        # converting once up front saves numpy doing it for every take
+        idx = np.asarray(idx, dtype=np.intp)
+
+        # a contiguous range of indices (as in in_chunks) can be sliced,
+        # which returns views into the parent instead of copies
+        s = _as_slice(idx, dataset.n)
+        if s is not None:
+            select = lambda array: array[s]
+        else:
+            select = lambda array: array.take(idx, axis=0)
+
+        z = select(dataset.z)
+        r = select(dataset.r)
         if dataset.b is not None:
-            b = dataset.b[idx]
+            b = select(dataset.b)
         else:
             b = None
 
         sub_properties = {}
 
         for p, v in dataset.p.items():
-            sub_properties[p] = v[idx]
+            sub_properties[p] = select(v)
 
         p = sub_properties
 
@@ -476,6 +563,7 @@ class Subset(Dataset):
             idx=idx,
             parent_info=parent_info,
             splits=splits,
+            _validate=False,  # taken from a valid dataset, so sizes match
         )
 
     def _get_config(self):
@@ -496,6 +584,26 @@ class Subset(Dataset):
         }
 
 
+def _as_slice(idx, length):
+    """Return the slice equivalent to idx, or None if it is not a contiguous range.
+
+    Ranges that don't fit into an array of the given length are left to take,
+    which raises an IndexError where slicing would silently truncate.
+    """
+
+    if idx.ndim != 1 or len(idx) == 0 or idx[0] < 0:
+        return None
+
+    start = idx[0]
+    if start + len(idx) > length:
+        return None
+
+    if np.array_equal(idx, np.arange(start, start + len(idx))):
+        return slice(start, start + len(idx))
+
+    return None
+
+
 def compute_dataset_info(dataset):
     """Information about a dataset.
 
@@ -514,8 +622,6 @@ def compute_dataset_info(dataset):
           max_distance: maximum distance between atoms in a system
           geometry: additional detailed info about geometries (see below)
     """
-    qmmlpack = import_qmmlpack("generate new datasets")
-
     z = dataset.z
     r = dataset.r
     p = dataset.p
@@ -524,32 +630,52 @@ def compute_dataset_info(dataset):
 
     i["number_systems"] = len(z)
 
+    # work on one flat array of atoms with a system index,
+    # instead of looping over the systems in python
+    counts = dataset.counts
+    flat_z = dataset.z_flat
+    system = np.repeat(np.arange(len(z)), counts)
+
+    # atomic numbers fit into one byte, which makes the
+    # passes over all atoms below cheaper (uint8 is radix sorted)
+    assert 0 <= flat_z.min() and flat_z.max() <= 255, "Atomic numbers must be in 0...255"
+    flat_z = flat_z.astype(np.uint8)
+
     # elements
-    i["elements"] = np.unique(
-        np.asarray([a for s in z for a in s], dtype=np.int)
-    )  # note that this is always sorted
+    i["elements"] = np.unique(flat_z).astype(int)  # note that this is always sorted
     i["total_elements"] = len(i["elements"])
 
-    i["max_elements_per_system"] = max([np.nonzero(np.bincount(s))[0].size for s in z])
-    i["max_same_element_per_system"] = max([max(np.bincount(s)) for s in z])
-    i["min_same_element_per_system"] = min([min(np.bincount(s)) for s in z])
+    # unique (system, element) pairs, sorted by system, with counts
+    n_el = int(flat_z.max()) + 1
+    pairs, pair_counts = np.unique(system * n_el + flat_z, return_counts=True)
+    pair_system = pairs // n_el
+    elements_per_system = np.bincount(pair_system, minlength=len(z))
+    starts = np.concatenate(([0], np.cumsum(elements_per_system)[:-1]))
+
+    i["max_elements_per_system"] = elements_per_system.max()
+    i["max_same_element_per_system"] = pair_counts.max()
+
+    # this is the minimum of np.bincount(s) over systems, which counts
+    # every element up to the largest one present, so it's zero unless
+    # a system contains each element from 0 to its heaviest
+    max_z = np.maximum.reduceat(flat_z, dataset.offsets[:-1])
+    min_counts = np.minimum.reduceat(pair_counts, starts)
+    i["min_same_element_per_system"] = np.where(
+        elements_per_system == max_z + 1, min_counts, 0
+    ).min()
 
     # systems
-    i["max_atoms_per_system"] = max([len(s) for s in z])
-    i["systems_per_element"] = np.asarray(
-        [np.sum([1 for m in z if el in m]) for el in range(118)], dtype=np.int
-    )
+    i["max_atoms_per_system"] = counts.max()
+    # every (system, element) pair occurs once, so counting the elements
+    # of the pairs gives the number of systems containing each element
+    i["systems_per_element"] = np.bincount(pairs % n_el, minlength=118)[:118]
 
     # atoms
-    i["atoms_by_system"] = np.array([len(s) for s in z], dtype=int)
+    i["atoms_by_system"] = counts
     i["total_atoms"] = np.sum(i["atoms_by_system"])
 
     # distances
-    dists = [
-        qmmlpack.lower_triangular_part(qmmlpack.distance_euclidean(rr), -1) for rr in r
-    ]
-    i["min_distance"] = min([min(d) for d in dists if len(d) > 0])
-    i["max_distance"] = max([max(d) for d in dists if len(d) > 0])
+    i["min_distance"], i["max_distance"] = distance_range(r)
 
     # geometry info
     geom = {}
@@ -577,6 +703,105 @@ def compute_dataset_info(dataset):
     return i
 
 
+def distance_range(r, n_jobs=-1, chunk_size=10000):
+    """Minimum and maximum interatomic distance within systems.
+
+    Uses a compiled kernel if `numba` is installed, and
+    falls back to batched numpy otherwise. Systems with
+    only one atom are ignored, but at least one system
+    must have more than one atom.
+
+    Large datasets are split into chunks of systems, which
+    are processed in parallel threads. (Both the kernel and
+    numpy release the GIL while computing.)
+
+    Args:
+        r: positions, ragged array of (n_atoms, 3) arrays
+        n_jobs: number of threads, passed to joblib
+        chunk_size: number of systems per chunk
+
+    Returns:
+        (min_distance, max_distance)
+    """
+
+    _check_counts(r)
+
+    try:
+        from .jit import distance_range_kernel
+    except ImportError:
+        distance_range_kernel = None
+
+    chunks = [r[i : i + chunk_size] for i in range(0, len(r), chunk_size)]
+
+    if len(chunks) == 1 or n_jobs == 1:
+        results = [_squared_distance_range(c, distance_range_kernel) for c in chunks]
+    else:
+        results = Parallel(n_jobs=n_jobs, prefer="threads")(
+            delayed(_squared_distance_range)(c, distance_range_kernel) for c in chunks
+        )
+
+    min_d2 = min(result[0] for result in results)
+    max_d2 = max(result[1] for result in results)
+
+    return np.sqrt(min_d2), np.sqrt(max_d2)
+
+
+def _squared_distance_range(r, kernel=None):
+    if kernel is None:
+        return _squared_distance_range_numpy(r)
+
+    counts = np.array([len(rr) for rr in r], dtype=int)
+    offsets = np.zeros(len(counts) + 1, dtype=int)
+    offsets[1:] = np.cumsum(counts)
+    flat_r = np.concatenate([np.asarray(rr, dtype=float).reshape(-1, 3) for rr in r])
+
+    return kernel(flat_r, offsets)
+
+
+def _distance_range_numpy(r, max_elements=2 ** 24):
+    _check_counts(r)
+    min_d2, max_d2 = _squared_distance_range_numpy(r, max_elements=max_elements)
+
+    return np.sqrt(min_d2), np.sqrt(max_d2)
+
+
+def _squared_distance_range_numpy(r, max_elements=2 ** 24):
+    # systems with the same number of atoms are stacked, so the
+    # pairwise distances can be computed in batches with numpy;
+    # batches are sized so the (batch, n, n, 3) difference array
+    # has at most max_elements entries (but at least one system)
+
+    counts = np.array([len(rr) for rr in r], dtype=int)
+
+    min_d2 = np.inf
+    max_d2 = -np.inf
+    for n in np.unique(counts):
+        if n < 2:
+            continue
+
+        idx = np.flatnonzero(counts == n)
+        upper = np.triu_indices(n, 1)
+        batch_size = max(1, max_elements // (3 * n ** 2))
+        for b in range(0, len(idx), batch_size):
+            batch = idx[b : b + batch_size]
+            positions = np.stack([np.asarray(r[j], dtype=float) for j in batch])
+            diff = positions[:, :, None, :] - positions[:, None, :, :]
+            d2 = np.einsum("sijk,sijk->sij", diff, diff)[:, upper[0], upper[1]]
+            min_d2 = min(min_d2, d2.min())
+            max_d2 = max(max_d2, d2.max())
+
+    return min_d2, max_d2
+
+
+def _check_counts(r):
+    counts = np.array([len(rr) for rr in r], dtype=int)
+
+    if counts.size == 0 or counts.max() < 2:
+        raise ValueError("Cannot compute interatomic distances: no system has more than one atom.")
+
+    return counts
+
+
 def compute_incidence(dataset):
     """Compute the atomic incidence matrix of a dataset
 
@@ -1,14 +1,27 @@
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 from cmlkit.dataset import Dataset, Subset
-from cmlkit.engine import _from_npy
+from cmlkit.engine import _from_npy, _from_config
 from cmlkit.env import dataset_path
 
+from .storage import read_dataset_npz
+
 classes = {Subset.kind: Subset, Dataset.kind: Dataset}
 
 
-def load_dataset(name, other_paths=[]):
-    """Load a dataset with given (file) name."""
+def load_dataset(name, other_paths=[], mmap_mode=None, validate=True):
+    """Load a dataset with given (file) name.
+
+    If mmap_mode is given (see np.memmap), the arrays of datasets
+    stored as .npz are memory-mapped instead of read into memory,
+    so only the parts that are actually used are read from disk.
+    Use "r" (read-only) or "c" (copy-on-write).
+
+    With validate=False, the stored hashes are trusted instead of
+    being checked against the data, which requires reading all of it.
+    Only use this for files you have written yourself.
+    """
     if isinstance(name, Dataset):
         return name
 
@@ -16,17 +29,43 @@ def load_dataset(name, other_paths=[]):
 
     # First, try if you have passed a fully formed dataset path
     if path.is_file():
-        return _from_npy(name, classes=classes)
+        return _load(path, mmap_mode, validate)
 
     # Go through the dataset paths, return the first dataset found
     all_paths = dataset_path + other_paths
     for p in all_paths:
         try:
             file = p / path
-            return _from_npy(file, classes=classes)
+            return _load(file, mmap_mode, validate)
         except FileNotFoundError:
             pass
 
     raise FileNotFoundError(
         "Could not find dataset {} in paths {}".format(name, all_paths)
     )
+
+
+def load_datasets(names, other_paths=[], mmap_mode=None, validate=True, max_workers=8):
+    """Load several datasets at once, in parallel threads.
+
+    Reading and hashing the arrays mostly happens outside the GIL,
+    so this is faster than loading them one by one. Returns a list
+    in the same order as names. See `load_dataset` for the arguments.
+    """
+
+    def load(name):
+        return load_dataset(
+            name, other_paths=other_paths, mmap_mode=mmap_mode, validate=validate
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(load, names))
+
+
+def _load(path, mmap_mode=None, validate=True):
+    # datasets saved with protocol 2 are .npz files, otherwise .npy
+    if path.suffix == ".npz" or (path.suffix != ".npy" and path.with_suffix(".npz").is_file()):
+        config = read_dataset_npz(path, mmap_mode=mmap_mode)
+        return _from_config(config, classes=classes, _validate=validate)
+    else:
+        return _from_npy(path, classes=classes, _validate=validate)
@@ -0,0 +1,43 @@
+"""Compiled kernels for dataset statistics.
+
+This module requires `numba`, which is an optional dependency,
+so it should only be imported on demand.
+"""
+
+import numpy as np
+from numba import njit
+
+
+@njit(nogil=True, cache=True)
+def distance_range_kernel(flat_r, offsets):
+    """Minimum and maximum squared distance within systems.
+
+    Streams through all pairs of atoms in each system without
+    storing the distances. Systems with one atom are ignored.
+
+    Args:
+        flat_r: (total_atoms, 3) array of positions
+        offsets: (n_systems + 1) array, system i is flat_r[offsets[i]:offsets[i+1]]
+
+    Returns:
+        (min_squared_distance, max_squared_distance)
+    """
+    n = len(offsets) - 1
+    mins = np.full(n, np.inf)
+    maxs = np.full(n, -np.inf)
+
+    for s in range(n):
+        mn = np.inf
+        mx = -np.inf
+        for i in range(offsets[s], offsets[s + 1]):
+            for j in range(i + 1, offsets[s + 1]):
+                d2 = 0.0
+                for k in range(3):
+                    d = flat_r[i, k] - flat_r[j, k]
+                    d2 += d * d
+                mn = min(mn, d2)
+                mx = max(mx, d2)
+        mins[s] = mn
+        maxs[s] = mx
+
+    return mins.min(), maxs.max()
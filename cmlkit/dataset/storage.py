@@ -0,0 +1,162 @@
+"""Flat .npz storage for Datasets.
+
+The default way of saving a Dataset is to pickle its config into an .npy file,
+which stores every system as a separate small array. Here, the ragged `z` and `r`
+are instead concatenated into one array each (plus the number of atoms per system),
+so a Dataset is stored as a handful of plain arrays in an .npz file, with the
+remaining metadata as json in a `_meta` member. No pickling is needed to load it.
+"""
+
+import json
+import numpy as np
+
+from cmlkit.engine import normalize_extension, read_npz
+
+protocol = 2  # the legacy .npy format is protocol 1
+
+
+def write_dataset_npz(path, dataset):
+    """Save dataset as flat .npz file at path."""
+
+    kind, config = next(iter(dataset.get_config().items()))
+
+    arrays = {"counts": dataset.counts, "z": dataset.z_flat, "r": dataset.r_flat}
+
+    # atomic numbers fit into one byte, so they're stored as such, and cast
+    # back on loading (the dtype matters for the hash); positions are left
+    # alone, since anything else would lose precision
+    z = arrays["z"]
+    z_dtype = z.dtype
+    if z_dtype.kind in "iu" and z.size > 0 and 0 <= z.min() and z.max() <= 255:
+        arrays["z"] = z.astype(np.uint8)
+
+    if config["b"] is not None:
+        arrays["b"] = np.asarray(config["b"])
+
+    for name, values in config["p"].items():
+        arrays[f"p/{name}"] = np.asarray(values)
+
+    for i, split in enumerate(config["splits"]):
+        for j, part in enumerate(split):
+            arrays[f"splits/{i}/{j}"] = np.asarray(part, dtype=int)
+
+    meta = {
+        "protocol": protocol,
+        "kind": kind,
+        "name": config["name"],
+        "desc": config["desc"],
+        "properties": list(config["p"].keys()),
+        "splits": [len(split) for split in config["splits"]],
+        "hash": config["_hash"],
+        "geom_hash": config["_geom_hash"],
+        "z_dtype": z_dtype.str,
+        # systems of equal size may be stored as one regular array instead of
+        # an object array; the layout is part of the hash, so it's restored
+        "shapes": {
+            "z": _regular_shape(config["z"]),
+            "r": _regular_shape(config["r"]),
+        },
+    }
+
+    if kind == "subset":
+        if config["idx"] is not None:
+            arrays["idx"] = np.asarray(config["idx"])
+        meta["parent_info"] = config["parent_info"]
+
+    # the info is stored as well, so it doesn't have to be recomputed on
+    # loading; it can't go stale, since the hash is checked on loading
+    meta["info"] = {}
+    for key, value in config["_info"].items():
+        if isinstance(value, np.ndarray):
+            arrays[f"info/{key}"] = value
+        else:
+            meta["info"][key] = value
+
+    blob = json.dumps(meta, default=_to_json).encode("utf-8")
+    arrays["_meta"] = np.frombuffer(blob, dtype=np.uint8)
+
+    np.savez(normalize_extension(path, ".npz"), **arrays)
+
+
+def read_dataset_npz(path, mmap_mode=None):
+    """Read a dataset saved by `write_dataset_npz` and return its config.
+
+    With mmap_mode, the arrays are memory-mapped (see `read_npz`), and the
+    systems in `z` and `r` are views into the mapped flat arrays.
+    """
+
+    arrays = read_npz(path, mmap_mode=mmap_mode)
+    meta = json.loads(arrays["_meta"].tobytes().decode("utf-8"))
+
+    assert meta["protocol"] == protocol, f"Dataset .npz files must be protocol {protocol}."
+
+    bounds = np.cumsum(arrays["counts"])[:-1]
+    arrays["z"] = arrays["z"].astype(meta["z_dtype"], copy=False)
+    shapes = meta.get("shapes", {})
+
+    config = {
+        "name": meta["name"],
+        "desc": meta["desc"],
+        "z": _unflatten(arrays["z"], bounds, shapes.get("z")),
+        "r": _unflatten(arrays["r"], bounds, shapes.get("r")),
+        "b": arrays.get("b", None),
+        "p": {name: arrays[f"p/{name}"] for name in meta["properties"]},
+        "splits": [
+            [arrays[f"splits/{i}/{j}"] for j in range(length)]
+            for i, length in enumerate(meta["splits"])
+        ],
+        "_hash": meta["hash"],
+        "_geom_hash": meta["geom_hash"],
+    }
+
+    if meta["kind"] == "subset":
+        config["idx"] = arrays.get("idx", None)
+        config["parent_info"] = meta["parent_info"]
+
+    if "info" in meta:
+        info = meta["info"]
+        for name, array in arrays.items():
+            if name.startswith("info/"):
+                info[name[5:]] = array
+
+        # json turns the (mean, std) tuples into lists
+        info["properties"] = {k: tuple(v) for k, v in info["properties"].items()}
+        config["_info"] = info
+
+    return {meta["kind"]: config}
+
+
+def _regular_shape(array):
+    if array.dtype.hasobject:
+        return None
+
+    return list(array.shape)
+
+
+def _unflatten(flat, bounds, shape):
+    if shape is None:
+        return to_object_array(np.split(flat, bounds))
+
+    return flat.reshape(shape)
+
+
+def _to_json(obj):
+    # the info contains numpy scalars, store them as plain numbers
+    if isinstance(obj, np.generic):
+        return obj.item()
+
+    raise TypeError(f"Cannot serialise {obj} of type {type(obj)} to json.")
+
+
+def to_object_array(arrays):
+    """Wrap a list of (possibly differently sized) arrays into an object array.
+
+    np.array would instead try to stack them, which fails for ragged input,
+    and silently creates a regular array if all entries have the same shape.
+    """
+
+    result = np.empty(len(arrays), dtype=object)
+    for i, array in enumerate(arrays):
+        result[i] = array
+
+    return result
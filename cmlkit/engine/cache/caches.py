@@ -1,6 +1,6 @@
 from pathlib import Path
 
-from cmlkit.engine import parse_config, compute_hash
+from cmlkit.engine import parse_config
 
 from .disk import DiskCache
 from .no import NoCache
@@ -9,8 +9,9 @@ from .no import NoCache
 class Caches:
     """Cache manager."""
 
-    def __init__(self, location):
+    def __init__(self, location, max_size=None):
         self.location = Path(location)
+        self.max_size = max_size
 
         self.caches = []
 
@@ -20,8 +21,11 @@ class Caches:
 
         cache_config = component.context.get("cache", "no")  # default to off
 
+        # the default, so don't bother parsing or hashing anything
+        if cache_config == "no":
+            return NoCache()
+
         if cache_config:
-            key = f"{component.kind}/{component.get_hash()}"
             cache_kind, cache_inner = parse_config(
                 cache_config, shortcut_ok=True
             )
@@ -30,11 +34,15 @@ class Caches:
                 return NoCache()
 
             elif cache_kind == "disk":
+                key = f"{component.kind}/{component.get_hash()}"
+
                 if "location" in cache_inner:
                     cache_inner["location"] = Path(cache_inner["location"]) / key
                 else:
                     cache_inner["location"] = self.location / key
 
+                cache_inner.setdefault("max_size", self.max_size)
+
                 cache = DiskCache(**cache_inner)
                 self.caches.append((str(component), key, cache))
 
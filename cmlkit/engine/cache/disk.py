@@ -1,4 +1,10 @@
+import json
+import os
+import shutil
+import time
+from collections import OrderedDict
 from pickle import UnpicklingError
+from zipfile import BadZipFile
 
 from cmlkit import logger
 from cmlkit.engine.data import load_data
@@ -9,42 +15,195 @@ from .cache import Cache
 class DiskCache(Cache):
     """Rudimentary disk cache.
 
-    WARNING: NO CLEANUP IS DONE. BE CAREFUL!
+    WARNING: By default, NO CLEANUP IS DONE. BE CAREFUL!
 
-    Defaults to dumping protocol 1, which is
-    non-compressed .npz files. If you know you
-    will be generating easily compressible files
+    If `max_size` (in MB) is given, the least recently
+    used entries are deleted whenever storing a new
+    entry exceeds it. Sizes and last use are tracked in
+    an `index.json` file in the cache location, which is
+    written when storing, so usage from other processes
+    is only taken into account approximately. The limit
+    applies per cache, i.e. per component. The default
+    can be set with the `CML_CACHE_MAX_SIZE` environment
+    variable.
+
+    The most recently retrieved `max_entries` results are
+    additionally kept in memory, so repeated lookups of the
+    same key in one process don't go through the disk.
+
+    Defaults to dumping protocol 3, which is a
+    directory of non-compressed .npy files that
+    can be memory-mapped on retrieval. If you know
+    you will be generating easily compressible files
     you can manually overwrite this in the component
-    context.
+    context (protocol 2 is compressed .npz).
+
+    Entries written in a different format than the
+    current protocol (e.g. .npz files written before
+    protocol 3 became the default) are still found,
+    and count towards `max_size`.
     """
 
-    def __init__(self, location, protocol=1):
+    def __init__(self, location, protocol=3, max_size=None, max_entries=64):
         super().__init__()
 
         self.location = location
         self.protocol = protocol
+        self.max_size = max_size
+        self.max_entries = max_entries
+
+        self._mem = OrderedDict()  # in-memory LRU of retrieved results
+
+        self._used = {}  # last use of entries since the index was written
+        self._stored = set()  # entries (re-)written since then, their size may have changed
+
+        self._location_exists = False  # only create the location once
 
     def filename(self, key):
-        return self.location / (key + ".npz")
+        if self.protocol == 3:
+            return self.location / key
+        else:
+            return self.location / (key + ".npz")
+
+    def find(self, key):
+        """Path of the entry for key, in any format, or None."""
+
+        for path in [self.filename(key), *self._formats(key)]:
+            if path.exists():
+                return path
+
+        return None
 
     def check(self, key):
-        return self.filename(key).is_file()
+        return key in self._mem or self.find(key) is not None
 
     def store(self, key, data):
-        self.location.mkdir(parents=True, exist_ok=True)
+        self._mem.pop(key, None)
+
+        if not self._location_exists:
+            self.location.mkdir(parents=True, exist_ok=True)
+            self._location_exists = True
+
         data.dump(self.filename(key), protocol=self.protocol)
 
+        # drop copies of this entry in other formats, they'd only be stale
+        for path in self._formats(key):
+            if path != self.filename(key):
+                self._delete(path)
+
+        if self.max_size is not None:
+            self._used[key] = time.time()
+            self._stored.add(key)
+            self.evict()
+
     def retrieve(self, key):
-        return load_data(self.filename(key))
+        if key in self._mem:
+            self._mem.move_to_end(key)
+            data = self._mem[key]
+        else:
+            data = load_data(self.find(key) or self.filename(key))
+
+            if self.max_entries > 0:
+                self._mem[key] = data
+                if len(self._mem) > self.max_entries:
+                    self._mem.popitem(last=False)
+
+        if self.max_size is not None:
+            self._used[key] = time.time()
+
+        return data
 
     def try_retrieve(self, key):
         # sometimes, corrupted data is written to disk
         # this catches it and deletes the corrupted data
         try:
             return self.retrieve(key)
-        except (EOFError, OSError, UnpicklingError):
-            filename = self.filename(key)
+        except (EOFError, OSError, ValueError, BadZipFile, UnpicklingError):
+            filename = self.find(key)
             logger.error(f"Could not read cache file {filename}; deleting it.")
-            filename.unlink()
+            self.remove(key)
 
             return None
+
+    def remove(self, key):
+        self._mem.pop(key, None)
+        self._used.pop(key, None)
+        self._stored.discard(key)
+
+        for path in self._formats(key):
+            self._delete(path)
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits into max_size."""
+
+        index = self._read_index()
+
+        for key, last_used in self._used.items():
+            if self.find(key) is None:
+                # removed by another process or cache instance in the meantime
+                continue
+            elif key not in index or key in self._stored:
+                index[key] = [self._size(key), last_used]
+            else:
+                index[key][1] = last_used
+        self._used = {}
+        self._stored = set()
+
+        budget = self.max_size * 1024 ** 2
+        total = sum(size for size, _ in index.values())
+
+        # never evict the most recently used entry
+        for key in sorted(index, key=lambda k: index[k][1])[:-1]:
+            if total <= budget:
+                break
+
+            total -= index[key][0]
+            del index[key]
+            self.remove(key)
+            logger.debug(f"Evicted {key} from disk cache at {self.location}.")
+
+        self._write_index(index)
+
+    def _formats(self, key):
+        # all the paths an entry can be stored at, depending on protocol
+        return [self.location / key, self.location / (key + ".npz")]
+
+    def _delete(self, path):
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _size(self, key):
+        filename = self.find(key)
+        if filename.is_dir():
+            return sum(f.stat().st_size for f in filename.iterdir())
+        else:
+            return filename.stat().st_size
+
+    def _read_index(self):
+        try:
+            with open(self.location / "index.json", "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            # no (readable) index yet: rebuild it from the entries on disk
+            index = {}
+            for path in self.location.iterdir():
+                # skip the index and entries that are still being written
+                if path.name.startswith(".") or path.name.startswith("index.json"):
+                    continue
+                key = path.name[:-4] if path.suffix == ".npz" else path.name
+                index[key] = [self._size(key), path.stat().st_mtime]
+
+        # entries may have been removed in the meantime
+        return {key: value for key, value in index.items() if self.find(key) is not None}
+
+    def _write_index(self, index):
+        # write to a temporary file first, so the index is never half-written
+        tmp = self.location / f"index.json.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp, self.location / "index.json")
@@ -120,6 +120,7 @@ class diskcached:
             0,
             0,
         )  # number of times function values were retrieved from cache/had to be computed
+        self.made_location = False  # cache_location is only created when first needed
 
     def __call__(self, *args, **kwargs):
         """Calls to cached function."""
@@ -153,7 +154,9 @@ class diskcached:
 
         if duration > self.min_duration:
             tosave = {"val": val, "name": self.name, "duration": duration}
-            makedir(self.cache_location)  # make sure cache_location exists
+            if not self.made_location:
+                makedir(self.cache_location)  # make sure cache_location exists
+                self.made_location = True
             safe_save_npy(filename, tosave)
 
         self.misses += 1
@@ -46,8 +46,16 @@ class Component(Configurable, metaclass=Cached):
         self.cache = caches.register(self)
 
     def get_hash(self):
-        """Hash of this component"""
-        return self.get_config_hash()
+        """Hash of this component
+
+        Components are not supposed to change after they
+        have been created, so this is only computed once.
+        (It is needed for every result, via `get_hid`.)
+        """
+        if getattr(self, "_hash", None) is None:
+            self._hash = self.get_config_hash()
+
+        return self._hash
 
     def get_hid(self):
         """History/human readable ID (kind@hash)
@@ -1,10 +1,28 @@
+import json
+import os
+import shutil
+import tempfile
+import uuid
 import numpy as np
 from pathlib import Path
 
 from cmlkit.engine.config import Configurable
-from cmlkit.engine.inout import normalize_extension
+from cmlkit.engine.inout import normalize_extension, read_npz
 from cmlkit.engine.hashing import compute_hash
 
+_from_config = None  # see _instantiate
+
+
+def _get_umask():
+    # the umask can only be read by setting it, so this is done once
+    # on import, rather than racing with other threads creating files
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+_umask = _get_umask()
+
 
 class Data(Configurable):
 
@@ -16,6 +34,8 @@ class Data(Configurable):
         self.info = info
         self.meta = meta
 
+        self._id = None
+
     @classmethod
     def create(cls, data=None, info=None, history=None):
         if history is None:
@@ -52,13 +72,20 @@ class Data(Configurable):
         return {"data": self.data, "info": self.info, "meta": self.meta}
 
     def dump(self, path, protocol=1):
-        assert protocol == 1 or protocol == 2, "Data only supports protocols 1 and 2 (.npz)"
+        assert protocol in (1, 2, 3), "Data only supports protocols 1, 2 (.npz) and 3 (.npy)"
 
-        write_data_npz(path, self.kind, self.data, self.info, self.meta, protocol=protocol)
+        if protocol == 3:
+            write_data_npy(path, self.kind, self.data, self.info, self.meta, protocol=protocol)
+        else:
+            write_data_npz(path, self.kind, self.data, self.info, self.meta, protocol=protocol)
 
     @property
     def id(self):
-        return compute_hash(self.history)
+        # the history never changes after creation, so hash it only once
+        if self._id is None:
+            self._id = compute_hash(self.history)
+
+        return self._id
 
     @property
     def history(self):
@@ -68,41 +95,206 @@ class Data(Configurable):
 def load_data(path):
     path = Path(path)
 
-    if path.suffix == ".npz":
+    if path.is_dir():
+        return load_data_npy(path)
+    elif path.suffix == ".npz":
         return load_data_npz(path)
     else:
         raise ValueError
 
 
 def load_data_npz(path):
+    # files written before the metadata was stored as json
+    # keep it in pickled object arrays, so we need to allow that
+    file = read_npz(path, allow_pickle=lambda names: "_meta.npy" not in names)
+
+    if "_meta" not in file:
+        header = {
+            "protocol": file["protocol"].item(),
+            "kind": file["kind"].item(),
+            "meta": file["meta"].item(),
+            "info": file["info"].item(),
+        }
+    else:
+        header = json.loads(file["_meta"].tobytes().decode("utf-8"))
 
-    with np.load(path, allow_pickle=True) as file:
-        protocol = file["protocol"].item()
-        assert protocol == 1 or protocol == 2, "npz data should be protocol 1 or 2"
-
-        kind = file["kind"].item()
-        meta = file["meta"].item()
-        info = file["info"].item()
-
-        data = {}
-        for name, array in file.items():
-            if name.split("/")[0] == "data":
-                data[name.split("/")[1]] = array
+    protocol = header["protocol"]
+    assert protocol == 1 or protocol == 2, "npz data should be protocol 1 or 2"
 
-        config = {kind: {"info": info, "data": data, "meta": meta}}
+    data = {}
+    for name, array in file.items():
+        if name.split("/")[0] == "data":
+            data[name.split("/")[1]] = array
 
-    from cmlkit import from_config
+    config = {header["kind"]: {"info": header["info"], "data": data, "meta": header["meta"]}}
 
-    return from_config(config)
+    return _instantiate(config)
 
 
 def write_data_npz(path, kind, data, info, meta, protocol):
-    kwds = {"kind": kind, "info": info, "meta": meta, "protocol": protocol}
+    _check_json(info, "info")
+    _check_json(meta, "meta")
+    header = {"kind": kind, "info": info, "meta": meta, "protocol": protocol}
+
+    # metadata is stored as json-encoded bytes, so no pickling is needed to load
+    blob = json.dumps(header, default=_to_json).encode("utf-8")
+    kwds = {"_meta": np.frombuffer(blob, dtype=np.uint8)}
 
     for name, array in data.items():
-        kwds[f"data/{name}"] = array
+        kwds[f"data/{name}"] = _check_array(array, name)
+
+    # write to a temporary file first, so the file is never half-written
+    path = normalize_extension(path, ".npz")
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+
+    try:
+        # mkstemp creates the file as owner-only, but cache entries
+        # may be shared, so give it the mode a plain open would have
+        os.fchmod(fd, 0o666 & ~_umask)
+        with os.fdopen(fd, "wb") as f:
+            if protocol == 1:
+                np.savez(f, **kwds)
+            elif protocol == 2:
+                np.savez_compressed(f, **kwds)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_data_npy(path, mmap_mode="c"):
+    """Load Data stored as a directory of .npy files.
+
+    Arrays are memory-mapped (copy-on-write by default), so only
+    the parts that are actually used get read from disk. They are
+    returned as plain ndarray views, since np.memmap hashes differently.
+    """
+
+    path = Path(path)
 
-    if protocol == 1:
-        np.savez(normalize_extension(path, ".npz"), **kwds)
-    elif protocol == 2:
-        np.savez_compressed(normalize_extension(path, ".npz"), **kwds)
+    with open(path / "meta.json", "r") as f:
+        header = json.load(f)
+
+    protocol = header["protocol"]
+    assert protocol == 3, "npy data should be protocol 3"
+
+    data = {}
+    for name in header["names"]:
+        array = np.load(path / f"{name}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+        data[name] = np.asarray(array)
+
+    config = {header["kind"]: {"info": header["info"], "data": data, "meta": header["meta"]}}
+
+    return _instantiate(config)
+
+
+def write_data_npy(path, kind, data, info, meta, protocol):
+    """Write Data as a directory with one .npy file per array and a json header.
+
+    Compared to .npz, this avoids the zip container entirely, and allows
+    the arrays to be memory-mapped when loading.
+
+    The directory is written under a temporary name and then moved into
+    place, so files that are already memory-mapped by an earlier load of
+    the same path are never overwritten (truncating a mapped file crashes
+    the process that has it mapped), and nobody sees a half-written entry.
+    """
+
+    _check_json(info, "info")
+    _check_json(meta, "meta")
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"))
+    os.chmod(tmp, 0o777 & ~_umask)  # mkdtemp makes it owner-only, see write_data_npz
+
+    for name, array in data.items():
+        np.save(tmp / f"{name}.npy", _check_array(array, name), allow_pickle=False)
+
+    header = {
+        "kind": kind,
+        "info": info,
+        "meta": meta,
+        "protocol": protocol,
+        "names": list(data.keys()),
+    }
+
+    with open(tmp / "meta.json", "w") as f:
+        json.dump(header, f, default=_to_json)
+
+    _publish_directory(tmp, path)
+
+
+def _publish_directory(tmp, path):
+    # os.replace can't overwrite a non-empty directory, so an existing
+    # entry is first moved aside and then deleted; deleting only unlinks
+    # its files, so existing memory maps stay valid
+    old = None
+    if path.exists():
+        old = path.with_name(f".{path.name}.{uuid.uuid4().hex}.old")
+        try:
+            os.replace(path, old)
+        except FileNotFoundError:
+            old = None
+
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        # another process has published this entry in the meantime
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def _instantiate(config):
+    # cmlkit can't be imported at module level (it imports this module),
+    # so from_config is imported on first use and then kept around
+    global _from_config
+    if _from_config is None:
+        from cmlkit import from_config as _from_config
+
+    return _from_config(config)
+
+
+def _check_array(array, name):
+    # object arrays would be pickled, which is slow, and can't be loaded
+    # without allow_pickle (or memory-mapped); ragged data should be stored
+    # as a flat array plus offsets instead (see AtomicRepresentation)
+    array = np.ascontiguousarray(array)
+    if array.dtype.hasobject:
+        raise ValueError(f"Data array {name} has dtype object, which can't be stored.")
+
+    return array
+
+
+def _to_json(obj):
+    # numpy scalars sometimes sneak into info/meta; they are
+    # stored as the equivalent plain python number
+    if isinstance(obj, np.generic):
+        return obj.item()
+
+    raise TypeError(f"Cannot serialise {obj} of type {type(obj)} to json.")
+
+
+def _check_json(obj, where):
+    """Make sure that obj survives a roundtrip through json unchanged.
+
+    json silently turns tuples into lists and non-string dict keys into
+    strings, so we refuse those (and anything else json can't handle)
+    rather than loading something different from what was dumped.
+    """
+
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if not isinstance(key, str):
+                raise ValueError(f"Data {where} can only have string keys, not {key!r}.")
+            _check_json(value, where)
+    elif isinstance(obj, list):
+        for value in obj:
+            _check_json(value, where)
+    elif not (obj is None or isinstance(obj, (str, bool, int, float, np.number, np.bool_))):
+        raise ValueError(
+            f"Data {where} must consist of dicts, lists, strings, numbers, bools and None, "
+            f"but contains {obj!r} of type {type(obj)}. (Arrays belong into data.)"
+        )
@@ -1,8 +1,11 @@
 """I/o. Talk to the disk!"""
 
 import numpy as np
+import pickle
 import yaml
 import son
+import struct
+import zipfile
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
 
@@ -51,11 +54,24 @@ def makedir(p):
 def save_npy(filename, d):
     """Save a dictionary with numpy.
 
+    This is what np.save does for a dict, i.e. the .npy header of a
+    0-d object array followed by a pickle of it, except that the newest
+    pickle protocol is used. (np.save is fixed to protocol 4.) From
+    protocol 5 on, arrays inside d are written straight from their
+    memory instead of being copied to bytes first. The result is read
+    with np.load/read_npy as before.
+
     Args:
         filename: Path-like object. (Extension not required.)
         d: Dict to save.
     """
-    np.save(normalize_extension(filename, ".npy"), d)
+    array = np.empty((), dtype=object)
+    array[()] = d
+
+    with open(normalize_extension(filename, ".npy"), "wb") as f:
+        header = np.lib.format.header_data_from_array_1_0(array)
+        np.lib.format.write_array_header_1_0(f, header)
+        pickle.dump(array, f, protocol=pickle.HIGHEST_PROTOCOL)
 
 
 def safe_save_npy(filename, d):
@@ -83,6 +99,98 @@ def read_npy(filename):
         return d
 
 
+def read_npz(filename, allow_pickle=False, mmap_mode=None):
+    """Load all arrays stored in an .npz file into a dict.
+
+    Uncompressed members are read straight from the underlying file,
+    bypassing the buffered stream that `zipfile.open` would provide,
+    which is much faster for large arrays. Compressed members fall
+    back to the regular path.
+
+    Args:
+        filename: Path-like object. (Extension not required.)
+        allow_pickle: Passed on to numpy, needed for object arrays.
+            Can also be a callable, which is given the list of member
+            names and returns a bool. That way, the decision can depend
+            on the contents without opening the archive twice.
+        mmap_mode: If given, uncompressed members are memory-mapped
+            with this mode (see np.memmap) instead of read, and returned
+            as plain ndarray views of the map. Object arrays and compressed
+            members are still read.
+    """
+
+    filename = normalize_extension(filename, ".npz")
+
+    arrays = {}
+    with open(filename, "rb") as f:
+        with zipfile.ZipFile(f) as zf:
+            if callable(allow_pickle):
+                allow_pickle = allow_pickle(zf.namelist())
+
+            for info in zf.infolist():
+                name = info.filename
+                if name.endswith(".npy"):
+                    name = name[:-4]
+
+                if info.compress_type == zipfile.ZIP_STORED:
+                    f.seek(_npz_member_offset(f, info))
+                    if mmap_mode is None:
+                        arrays[name] = np.lib.format.read_array(f, allow_pickle=allow_pickle)
+                    else:
+                        arrays[name] = _map_array(f, filename, mmap_mode, allow_pickle)
+                else:
+                    with zf.open(info) as member:
+                        arrays[name] = np.lib.format.read_array(
+                            member, allow_pickle=allow_pickle
+                        )
+
+    return arrays
+
+
+def _map_array(f, filename, mmap_mode, allow_pickle):
+    """Memory-map the .npy array starting at the current position of f."""
+
+    start = f.tell()
+    version = np.lib.format.read_magic(f)
+
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    elif version == (2, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+
+    if version not in [(1, 0), (2, 0)] or dtype.hasobject or 0 in shape:
+        # can't (or don't need to) be mapped
+        f.seek(start)
+        return np.lib.format.read_array(f, allow_pickle=allow_pickle)
+
+    array = np.memmap(
+        filename,
+        dtype=dtype,
+        mode=mmap_mode,
+        offset=f.tell(),
+        shape=shape,
+        order="F" if fortran_order else "C",
+    )
+
+    # np.memmap hashes differently from the equivalent ndarray
+    return np.asarray(array)
+
+
+def _npz_member_offset(f, info):
+    """Offset of the raw bytes of a zip member within the file f."""
+
+    # the local file header has a fixed size of 30 bytes, followed
+    # by the filename and an extra field of variable length, which
+    # are not guaranteed to match the ones in the central directory
+    f.seek(info.header_offset)
+    header = f.read(30)
+    if header[:4] != b"PK\x03\x04":
+        raise ValueError(f"Corrupted local header for {info.filename}.")
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+
+    return info.header_offset + 30 + name_length + extra_length
+
+
 def save_yaml(filename, d):
     """Save a dict as yaml.
 
@@ -9,7 +9,7 @@ def get_scratch():
         scratch_location = os.environ["CML_SCRATCH"]
     else:
         # default to current running path of the script + /cml_scratch/
-        current = os.environ["PWD"]
+        current = os.getcwd()
         scratch_location = os.path.join(current, "cml_scratch")
 
     scratch_location = Path(os.path.normpath(scratch_location))
@@ -37,9 +37,15 @@ if "CML_CACHE" in os.environ:
     cache_location = Path(str(os.environ["CML_CACHE"]))
 else:
     # default to current running path of the script + /cml_cache/
-    current = os.environ["PWD"]
+    current = os.getcwd()
     cache_location = Path(current) / "cml_cache"
 
+# maximum size of each disk cache in MB, unbounded by default
+if "CML_CACHE_MAX_SIZE" in os.environ:
+    cache_max_size = float(os.environ["CML_CACHE_MAX_SIZE"])
+else:
+    cache_max_size = None
+
 
 # path of ruNNer binary (needed for symmetry functions)
 if "CML_RUNNER_PATH" in os.environ:
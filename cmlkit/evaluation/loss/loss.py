@@ -27,7 +27,7 @@ the `lossf` module.
 
 """
 
-from .lossfs import get_lossf, lossfs
+from .lossfs import get_lossf, lossfs, fused
 
 shortcuts = {
     "default": ["rmse", "mae", "r2"],
@@ -45,6 +45,9 @@ shortcuts = {
 }
 
 
+fusable = [lossfs["rmse"], lossfs["mae"], lossfs["r2"]]
+
+
 class Loss:
     """Loss wraps multiple loss functions.
 
@@ -68,7 +71,18 @@ class Loss:
     def __call__(self, true, pred, pv=None):
         """Compute multiple losses and returns them in dict."""
 
-        return {l.__name__: l(true, pred, pv=pv) for l in self.lossfs}
+        # rmse, mae and r2 share intermediate results, so if more
+        # than one of them is requested, they are computed together
+        names = [l.__name__ for l in self.lossfs if l in fusable]
+        if len(names) > 1:
+            shared = fused(true, pred, names=names)
+        else:
+            shared = {}
+
+        return {
+            l.__name__: shared[l.__name__] if l.__name__ in shared else l(true, pred, pv=pv)
+            for l in self.lossfs
+        }
 
 
 def get_loss(*args):
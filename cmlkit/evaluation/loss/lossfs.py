@@ -11,7 +11,7 @@ import numpy as np
 
 def rmse(true, pred, pv=None):
     """Root mean squared error."""
-    return np.sqrt(np.mean((true - pred) ** 2))
+    return _rmse(true - pred)
 
 
 def rmsle(true, pred, pv=None):
@@ -21,12 +21,12 @@ def rmsle(true, pred, pv=None):
     useful to compare losses for quantities with differing
     orders of magnitude.
     """
-    return np.sqrt(np.mean(np.log((pred + 1.0) / (true + 1.0)) ** 2))
+    return _rmse(np.log1p(pred) - np.log1p(true))
 
 
 def mae(true, pred, pv=None):
     """Mean absolute error."""
-    return np.mean(np.fabs(true - pred))
+    return _mae(true - pred)
 
 
 def medianae(true, pred, pv=None):
@@ -55,7 +55,7 @@ def r2(true, pred, pv=None):
 
     For KRR, this r2 is typically used instead of the more general definition.
     """
-    return np.corrcoef(true, pred)[0, 1] ** 2
+    return _r2(true, pred)
 
 
 def cod(true, pred, pv=None):
@@ -92,6 +92,54 @@ def mnlp(true, pred, pv):
     raise NotImplementedError("Someone should implement mnlp loss.")
 
 
+def fused(true, pred, names=("rmse", "mae", "r2")):
+    """Compute rmse, mae and r2 together.
+
+    The residuals are computed only once and shared between rmse
+    and mae, and r2 is computed from dot products instead of
+    np.corrcoef, which stacks and copies both arrays. Results are
+    identical to calling the individual lossfs.
+
+    Args:
+        names: Which of "rmse", "mae" and "r2" to compute.
+
+    Returns:
+        Dict with the requested names as keys.
+    """
+    result = {}
+
+    if "rmse" in names or "mae" in names:
+        residuals = true - pred
+        if "rmse" in names:
+            result["rmse"] = _rmse(residuals)
+        if "mae" in names:
+            result["mae"] = _mae(residuals)
+
+    if "r2" in names:
+        result["r2"] = _r2(true, pred)
+
+    return result
+
+
+def _rmse(residuals):
+    # the dot product squares and sums in one pass, without a temporary
+    residuals = residuals.ravel()
+    return np.sqrt(np.dot(residuals, residuals) / residuals.size)
+
+
+def _mae(residuals):
+    return np.sum(np.fabs(residuals)) / residuals.size
+
+
+def _r2(true, pred):
+    # centering first avoids the cancellation of the one-pass formula
+    true = true - np.mean(true)
+    pred = pred - np.mean(pred)
+    r = np.dot(true, pred) / np.sqrt(np.dot(true, true) * np.dot(pred, pred))
+
+    return np.clip(r, -1.0, 1.0) ** 2
+
+
 # Set some additional attributes by hand because decorators are tedious.
 
 rmse.longname = "root_mean_squared_error"
@@ -250,6 +250,8 @@ def make_grid(label, start, stop, num, base=2.0):
     # we carry numpy floats through the computation, which don't hash
     # to the same values as their plain float counterparts, which in
     # turn makes evaluation ids not match after a roundtrip through yaml.
+    # (for the same reason, don't replace this with np.exp2 for base 2:
+    # it is not bitwise identical, so ids of existing runs would change.)
     choices = np.logspace(start, stop, num=num, base=base).tolist()
 
     return (label, choices)
@@ -1,3 +1,4 @@
+import sys
 import numpy as np
 
 from unittest import TestCase
@@ -6,68 +7,68 @@ import shutil
 import pathlib
 from copy import copy
 
-from cmlkit.dataset import Dataset, Subset, load_dataset
+from cmlkit.dataset import Dataset, Subset, load_dataset, load_datasets
+from cmlkit.dataset.dataset import distance_range, _distance_range_numpy
 
 
 class TestDataset(TestCase):
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
+        # the datasets are never modified, so they can be shared between tests
         np.random.seed(123)
 
-        self.tmpdir = pathlib.Path(__file__).parent / "tmp_test_dataset"
-        self.tmpdir.mkdir(exist_ok=True)
+        cls.n = 100
+        cls.n_atoms = np.random.randint(1, high=10, size=cls.n)
 
-        self.n = 100
-        self.n_atoms = np.random.randint(1, high=10, size=self.n)
-
-        r = [2 * np.random.random((na, 3)) for na in self.n_atoms]
-        self.r = np.array(r, dtype=object)
-        self.z = np.array(
-            [np.random.randint(1, high=10, size=na) for na in self.n_atoms], dtype=object
+        r = [2 * np.random.random((na, 3)) for na in cls.n_atoms]
+        cls.r = np.array(r, dtype=object)
+        cls.z = np.array(
+            [np.random.randint(1, high=10, size=na) for na in cls.n_atoms], dtype=object
         )
-        self.b = np.random.random((self.n, 3, 3))
-        self.p1 = np.random.random(self.n)
-        self.p2 = np.random.random(self.n)
-        self.splits = np.array(
+        cls.b = np.random.random((cls.n, 3, 3))
+        cls.p1 = np.random.random(cls.n)
+        cls.p2 = np.random.random(cls.n)
+        cls.splits = np.array(
             [
                 [
-                    np.random.randint(0, high=self.n, size=80),
-                    np.random.randint(0, high=self.n, size=80),
+                    np.random.randint(0, high=cls.n, size=80),
+                    np.random.randint(0, high=cls.n, size=80),
                 ]
                 for i in range(3)
             ],
             dtype=object,
         )
 
-        self.data = Dataset(
-            z=self.z,
-            r=self.r,
-            b=self.b,
-            p={"p1": self.p1, "p2": self.p2},
+        cls.data = Dataset(
+            z=cls.z,
+            r=cls.r,
+            b=cls.b,
+            p={"p1": cls.p1, "p2": cls.p2},
             name="test",
             desc="test",
-            splits=self.splits,
+            splits=cls.splits,
         )
 
-        self.data_nocell = Dataset(
-            z=self.z,
-            r=self.r,
-            p={"p1": self.p1, "p2": self.p2},
+        cls.data_nocell = Dataset(
+            z=cls.z,
+            r=cls.r,
+            p={"p1": cls.p1, "p2": cls.p2},
             name="test",
             desc="test",
-            splits=self.splits,
+            splits=cls.splits,
         )
 
-        self.data2 = Dataset(
-            z=self.z,
-            r=self.r,
-            b=self.b,
-            p={"p1": self.p1, "p2": self.p2},
+        cls.data2 = Dataset(
+            z=cls.z,
+            r=cls.r,
+            b=cls.b,
+            p={"p1": cls.p1, "p2": cls.p2},
             name="test2",
             desc="test2",
         )
 
-        self.data_nop = Dataset(
-            z=self.z, r=self.r, b=self.b, p={}, name="test", desc="test"
+        cls.data_nop = Dataset(
+            z=cls.z, r=cls.r, b=cls.b, p={}, name="test", desc="test"
         )
 
         # roll a new dataset
@@ -84,10 +85,14 @@ class TestDataset(TestCase):
         p1 = np.random.random(n)
         p2 = np.random.random(n)
 
-        self.different = Dataset(
+        cls.different = Dataset(
             z=z, r=r, b=b, p={"p1": p1, "p2": p2}, name="test_different", desc="test!"
         )
 
+    def setUp(self):
+        self.tmpdir = pathlib.Path(__file__).parent / "tmp_test_dataset"
+        self.tmpdir.mkdir(exist_ok=True)
+
     def tearDown(self):
         shutil.rmtree(self.tmpdir)
 
@@ -112,6 +117,63 @@ class TestDataset(TestCase):
         with self.assertRaises(AssertionError):
             Dataset(z=[np.zeros(len(self.data.r[0]))], r=self.data.r)
 
+        with self.assertRaises(AssertionError):
+            Dataset(z=self.data.z, r=self.data.r, b=self.data.b[:3])
+
+    def test_info(self):
+        info = self.data.info
+
+        systems_per_element = [sum(el in s for s in self.z) for el in range(118)]
+        np.testing.assert_array_equal(info["systems_per_element"], systems_per_element)
+        np.testing.assert_array_equal(info["atoms_by_system"], self.n_atoms)
+        np.testing.assert_array_equal(info["elements"], np.unique(np.concatenate(self.z)))
+
+    def test_info_is_lazy(self):
+        with unittest.mock.patch(
+            "cmlkit.dataset.dataset.compute_dataset_info", return_value={}
+        ) as compute:
+            subset = Subset.from_dataset(self.data, idx=[1, 2, 3])
+            compute.assert_not_called()
+
+            subset.info
+            subset.info
+            compute.assert_called_once_with(subset)
+
+    def test_flat(self):
+        offsets = self.data.offsets
+        self.assertEqual(len(offsets), self.n + 1)
+
+        for i in [0, 17, self.n - 1]:
+            start, stop = offsets[i], offsets[i + 1]
+            np.testing.assert_array_equal(self.data.z_flat[start:stop], self.z[i])
+            np.testing.assert_array_equal(self.data.r_flat[start:stop], self.r[i])
+
+    def test_aux(self):
+        aux = self.data.aux
+
+        np.testing.assert_array_equal(aux["n_atoms"], self.n_atoms)
+        np.testing.assert_array_equal(aux["n_non_O"], [np.sum(z != 8) for z in self.z])
+        np.testing.assert_array_equal(aux["n_non_H"], [np.sum(z != 1) for z in self.z])
+
+    def test_creation_from_lists(self):
+        data = Dataset(z=list(self.z), r=list(self.r), p={"p1": list(self.p1)})
+
+        self.assertEqual(data.z.dtype, object)
+        self.assertEqual(data.r.dtype, object)
+        self.assertIsInstance(data.p["p1"], np.ndarray)
+
+        sub = Subset.from_dataset(data, idx=[0, 2])
+        np.testing.assert_array_equal(sub.z[1], self.z[2])
+        self.assertEqual(sub.idx.dtype, np.intp)
+
+        strided = Dataset(z=self.z, r=self.r, p={"p1": np.repeat(self.p1, 2)[::2]})
+        self.assertTrue(strided.p["p1"].flags.c_contiguous)
+        self.assertEqual(strided.hash, Dataset(z=self.z, r=self.r, p={"p1": self.p1}).hash)
+
+    def test_interned(self):
+        self.assertIs(self.data.name, sys.intern("test"))
+        self.assertIs(self.data.id, self.data2.id)
+
     def test_hash_stable(self):
         # is the dataset hash stable across restarts?
         self.assertEqual(self.data.hash, "97e4cdce3be9851e9c109c3509bc65e1")
@@ -134,6 +196,93 @@ class TestDataset(TestCase):
         self.assertEqual(self.data.desc, data3.desc)
         np.testing.assert_array_equal(data3.splits, self.splits)
 
+    def test_roundtrip_protocol_1(self):
+        self.data.save(directory=self.tmpdir, protocol=1)
+        self.assertTrue((self.tmpdir / "test.npy").is_file())
+        data3 = load_dataset("test", other_paths=[self.tmpdir])
+        self.assertEqual(self.data.hash, data3.hash)
+        np.testing.assert_array_equal(data3.splits, self.splits)
+
+    def test_roundtrip_protocol_2(self):
+        self.data.save(directory=self.tmpdir, protocol=2)
+        data3 = load_dataset("test", other_paths=[self.tmpdir])
+        self.assertEqual(self.data.hash, data3.hash)
+        self.assertEqual(self.data.geom_hash, data3.geom_hash)
+        self.assertEqual(self.data.name, data3.name)
+        self.assertEqual(self.data.desc, data3.desc)
+        np.testing.assert_array_equal(data3.splits, self.splits)
+
+        self.assertEqual(data3.z[0].dtype, self.z[0].dtype)
+
+        # the info is stored, not recomputed
+        with unittest.mock.patch("cmlkit.dataset.dataset.compute_dataset_info") as compute:
+            data4 = load_dataset("test", other_paths=[self.tmpdir])
+            compute.assert_not_called()
+
+        self.assertEqual(data4.report, self.data.report)
+        for key, value in self.data.info.items():
+            np.testing.assert_equal(data4.info[key], value)
+
+        subset = Subset.from_dataset(self.data_nocell, idx=[3, 1, 5], name="subset")
+        subset.save(directory=self.tmpdir, protocol=2)
+        subset2 = load_dataset(self.tmpdir / "subset.npz")
+        self.assertEqual(subset.hash, subset2.hash)
+        self.assertIsNone(subset2.b)
+        np.testing.assert_array_equal(subset2.idx, [3, 1, 5])
+
+        # subsets can also be created without idx
+        subset = Subset(z=self.z, r=self.r, name="subset_noidx")
+        subset.save(directory=self.tmpdir, protocol=2)
+        subset2 = load_dataset(self.tmpdir / "subset_noidx.npz")
+        self.assertEqual(subset.hash, subset2.hash)
+        self.assertIsNone(subset2.idx)
+
+    def test_roundtrip_protocol_2_regular(self):
+        # systems of equal size can be given as regular arrays
+        z = np.random.randint(1, high=10, size=(5, 3))
+        r = np.random.random((5, 3, 3))
+        data = Dataset(z=z, r=r, p={"p1": np.random.random(5)}, name="regular")
+
+        data.save(directory=self.tmpdir, protocol=2)
+        data2 = load_dataset("regular", other_paths=[self.tmpdir])
+        self.assertEqual(data.hash, data2.hash)
+        self.assertEqual(data2.z.shape, (5, 3))
+        self.assertEqual(data2.r.shape, (5, 3, 3))
+        np.testing.assert_array_equal(data2.r, r)
+
+    def test_load_datasets(self):
+        self.data.save(directory=self.tmpdir)
+        self.different.save(directory=self.tmpdir)
+
+        loaded = load_datasets(["test_different", "test"], other_paths=[self.tmpdir])
+        self.assertEqual([d.hash for d in loaded], [self.different.hash, self.data.hash])
+
+    def test_empty_subset(self):
+        with self.assertRaises(AssertionError):
+            Subset.from_dataset(self.data, idx=[])
+
+    def test_load_without_validation(self):
+        self.data.save(directory=self.tmpdir)
+
+        with unittest.mock.patch.object(Dataset, "get_hash") as get_hash:
+            data3 = load_dataset("test", other_paths=[self.tmpdir], validate=False)
+            get_hash.assert_not_called()
+
+        self.assertEqual(data3.hash, self.data.hash)
+
+        with unittest.mock.patch.object(Dataset, "get_hash", return_value="wrong"):
+            with self.assertRaises(AssertionError):
+                load_dataset("test", other_paths=[self.tmpdir])
+
+    def test_roundtrip_mmap(self):
+        self.data.save(directory=self.tmpdir)
+        data3 = load_dataset("test", other_paths=[self.tmpdir], mmap_mode="r")
+        self.assertEqual(self.data.hash, data3.hash)
+        self.assertFalse(data3.r[0].flags.writeable)
+
+        subset = Subset.from_dataset(data3, idx=[4, 2])
+        np.testing.assert_array_equal(subset.r[0], self.r[4])
+
     def test_subset(self):
         idx = np.array([3, 1, 5, 6, 28, 32, 11], dtype=int)
         subset = Subset.from_dataset(self.data, idx=idx, name="subset")
@@ -167,6 +316,30 @@ class TestDataset(TestCase):
                 self.assertEqual(s.n, 10)
                 np.testing.assert_array_equal(s.b, self.data.b[90:100])
 
+    def test_contiguous_subset_is_view(self):
+        subset = Subset.from_dataset(self.data, idx=np.arange(10, 40))
+        self.assertTrue(np.shares_memory(subset.b, self.data.b))
+        self.assertTrue(np.shares_memory(subset.p["p1"], self.data.p["p1"]))
+
+        # same result as copying
+        idx = list(range(10, 40))
+        copied = Subset(
+            z=self.data.z[idx],
+            r=self.data.r[idx],
+            b=self.data.b[idx],
+            p={k: v[idx] for k, v in self.data.p.items()},
+            name=subset.name,
+        )
+        self.assertEqual(subset.hash, copied.hash)
+        self.assertEqual(subset.geom_hash, copied.geom_hash)
+
+        with self.assertRaises(IndexError):
+            Subset.from_dataset(self.data, idx=np.arange(95, 105))
+
+        subset = Subset.from_dataset(self.data, idx=[10, 12, 11])
+        self.assertFalse(np.shares_memory(subset.b, self.data.b))
+        np.testing.assert_array_equal(subset.b, self.data.b[[10, 12, 11]])
+
     def test_ase(self):
         atoms = self.data.as_Atoms()
 
@@ -198,3 +371,44 @@ class TestDataset(TestCase):
 
         dataset = Dataset.from_Atoms(atoms)
         self.assertEqual(dataset.geom_hash, self.data_nocell.geom_hash)
+
+
+class TestDistanceRange(TestCase):
+    def setUp(self):
+        np.random.seed(123)
+        n_atoms = np.random.randint(1, high=10, size=50)
+        self.r = np.array([2 * np.random.random((na, 3)) for na in n_atoms], dtype=object)
+
+        dists = []
+        for rr in self.r:
+            d = np.sqrt(np.sum((rr[:, None, :] - rr[None, :, :]) ** 2, axis=-1))
+            dists.append(d[np.triu_indices(len(rr), 1)])
+        dists = np.concatenate(dists)
+
+        self.expected = (dists.min(), dists.max())
+
+    def test_distance_range(self):
+        np.testing.assert_allclose(distance_range(self.r), self.expected)
+
+    def test_distance_range_chunked(self):
+        np.testing.assert_allclose(distance_range(self.r, chunk_size=7), self.expected)
+        np.testing.assert_allclose(
+            distance_range(self.r, n_jobs=1, chunk_size=7), self.expected
+        )
+
+    def test_distance_range_numpy(self):
+        np.testing.assert_allclose(_distance_range_numpy(self.r), self.expected)
+        np.testing.assert_allclose(
+            _distance_range_numpy(self.r, max_elements=100), self.expected
+        )
+
+    def test_distance_range_single_atoms(self):
+        r = np.empty(3, dtype=object)
+        for j in range(3):
+            r[j] = np.random.random((1, 3))
+
+        with self.assertRaises(ValueError):
+            distance_range(r)
+
+        with self.assertRaises(ValueError):
+            _distance_range_numpy(r)
@@ -9,6 +9,7 @@ import time
 
 from cmlkit.engine import Component
 from cmlkit.engine.data import Data
+from cmlkit.engine.cache.disk import DiskCache
 
 tmpdir = pathlib.Path(__file__).parent / "tmp_test_engine_cache"
 tmpdir.mkdir(exist_ok=True)
@@ -73,6 +74,12 @@ class TestEngineCache(TestCase):
             result.get_config_hash(), self.output.get_config_hash()
         )
 
+    def test_no_cache_skips_hashing(self):
+        component = DummyComponent1(a=2.0, context={"cache": "no"})
+
+        self.assertIsNone(getattr(component, "_hash", None))
+        self.assertEqual(component(self.input).history, self.output.history)
+
     def test_faster_with_diskcache(self):
         # does it return correct results,
         # and get faster?!
@@ -95,3 +102,106 @@ class TestEngineCache(TestCase):
         self.assertEqual(
             result.get_config_hash(), self.output.get_config_hash()
         )
+
+
+class TestDiskCache(TestCase):
+    def setUp(self):
+        self.tmpdir = tmpdir
+        self.tmpdir.mkdir(exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_eviction(self):
+        # each entry is a bit more than 0.4MB
+        cache = DiskCache(self.tmpdir / "evict", max_size=1.0)
+        entries = {key: Data.create(data={"x": np.ones(50000)}) for key in "abc"}
+
+        cache.submit("a", entries["a"])
+        cache.submit("b", entries["b"])
+        cache.get("a")  # a is now used more recently than b
+        cache.submit("c", entries["c"])
+
+        self.assertTrue("a" in cache)
+        self.assertFalse("b" in cache)
+        self.assertTrue("c" in cache)
+
+        # another instance picks up the index
+        cache2 = DiskCache(self.tmpdir / "evict", max_size=1.0)
+        cache2.submit("b", entries["b"])
+        self.assertFalse("a" in cache2)
+        self.assertTrue("b" in cache2)
+        self.assertTrue("c" in cache2)
+
+    def test_eviction_with_entries_removed_elsewhere(self):
+        cache = DiskCache(self.tmpdir / "removed", max_size=1.0)
+        cache2 = DiskCache(self.tmpdir / "removed", max_size=1.0)
+
+        cache.submit("a", Data.create(data={"x": np.ones(50000)}))
+        cache.submit("b", Data.create(data={"x": np.ones(50000)}))
+        cache.get("a")
+
+        # another instance deletes the entry we just used
+        cache2.remove("a")
+        cache.submit("c", Data.create(data={"x": np.ones(50000)}))
+
+        self.assertFalse((self.tmpdir / "removed" / "a").exists())
+        self.assertTrue("b" in cache2)
+        self.assertTrue("c" in cache2)
+
+        # and the entry removed by try_retrieve is forgotten as well
+        shutil.rmtree(self.tmpdir / "removed" / "b")
+        (self.tmpdir / "removed" / "b").mkdir()
+        self.assertIsNone(cache.get_if_cached("b"))
+        cache.submit("d", Data.create(data={"x": np.ones(50000)}))
+        self.assertTrue("d" in cache)
+
+    def test_finds_legacy_npz_entries(self):
+        legacy = DiskCache(self.tmpdir / "legacy", protocol=1)
+        legacy.submit("a", Data.create(data={"x": np.ones(50000)}))
+        legacy.submit("b", Data.create(data={"x": np.ones(50000)}))
+
+        cache = DiskCache(self.tmpdir / "legacy", max_size=1.0)
+        self.assertTrue("a" in cache)
+        np.testing.assert_array_equal(cache.get("a").data["x"], np.ones(50000))
+
+        # legacy entries count towards the limit, and get evicted
+        cache.submit("c", Data.create(data={"x": np.ones(50000)}))
+        self.assertTrue("a" in cache)
+        self.assertFalse("b" in cache)
+        self.assertFalse((self.tmpdir / "legacy" / "b.npz").exists())
+
+        # storing again replaces the legacy entry
+        cache.submit("a", Data.create(data={"x": np.zeros(3)}))
+        self.assertFalse((self.tmpdir / "legacy" / "a.npz").exists())
+        np.testing.assert_array_equal(cache.get("a").data["x"], np.zeros(3))
+
+        # and its size in the index is updated
+        index = cache._read_index()
+        self.assertEqual(index["a"][0], cache._size("a"))
+
+    def test_no_eviction_by_default(self):
+        cache = DiskCache(self.tmpdir / "no_evict")
+        for key in "abc":
+            cache.submit(key, Data.create(data={"x": np.ones(50000)}))
+
+        for key in "abc":
+            self.assertTrue(key in cache)
+        self.assertFalse((self.tmpdir / "no_evict" / "index.json").exists())
+
+    def test_memory_lru(self):
+        cache = DiskCache(self.tmpdir / "mem", max_entries=2)
+        for key in "abc":
+            cache.submit(key, Data.create(data={"x": np.ones(3)}))
+
+        a = cache.get("a")
+        self.assertIs(cache.get("a"), a)
+
+        cache.get("b")
+        cache.get("c")  # pushes out a
+        self.assertEqual(list(cache._mem.keys()), ["b", "c"])
+        self.assertIsNot(cache.get("a"), a)
+
+        # storing invalidates the in-memory entry
+        cache.submit("a", Data.create(data={"x": np.zeros(3)}))
+        np.testing.assert_array_equal(cache.get("a").data["x"], np.zeros(3))
@@ -62,7 +62,7 @@ class TestDataBasic(TestCase):
         self.assertEqual(data.history, data2.history)
         self.assertEqual(data.id, data2.id)
 
-    def test_roundtrip_protocol_1(self):
+    def test_roundtrip_protocol_2(self):
         data = {"asdf": np.random.random(10), "jkl": np.random.random(10)}
         info = {"property": 123}
 
@@ -77,6 +77,122 @@ class TestDataBasic(TestCase):
         self.assertEqual(data.history, data2.history)
         self.assertEqual(data.id, data2.id)
 
+    def test_roundtrip_protocol_3(self):
+        data = {"asdf": np.random.random(10), "jkl": np.random.random((10, 3))}
+        info = {"property": 123}
+
+        data = DataExample.create(data=data, info=info)
+
+        data.dump(self.tmpdir / "test_3", protocol=3)
+        self.assertTrue((self.tmpdir / "test_3").is_dir())
+        data2 = load_data(self.tmpdir / "test_3")
+
+        np.testing.assert_array_equal(data.data["asdf"], data2.data["asdf"])
+        np.testing.assert_array_equal(data.data["jkl"], data2.data["jkl"])
+        self.assertEqual(data.info["property"], data2.info["property"])
+        self.assertEqual(data.history, data2.history)
+        self.assertEqual(data.id, data2.id)
+
+    def test_overwrite_protocol_3_keeps_loaded_data(self):
+        # re-dumping to the same path must not truncate files
+        # that an earlier load still has memory-mapped
+        data = DataExample.create(data={"asdf": np.random.random(100000)})
+
+        data.dump(self.tmpdir / "test_3", protocol=3)
+        data2 = load_data(self.tmpdir / "test_3")
+        data.dump(self.tmpdir / "test_3", protocol=3)
+
+        np.testing.assert_array_equal(data.data["asdf"], data2.data["asdf"])
+        np.testing.assert_array_equal(
+            data.data["asdf"], load_data(self.tmpdir / "test_3").data["asdf"]
+        )
+        self.assertEqual(
+            [p.name for p in self.tmpdir.iterdir()], ["test_3"]
+        )
+
+    def test_failed_npz_dump_leaves_nothing_behind(self):
+        data = DataExample.create(data={"x": np.ones(3)})
+        data.dump(self.tmpdir / "test_1", protocol=1)
+
+        with unittest.mock.patch("numpy.savez", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                data.dump(self.tmpdir / "test_1", protocol=1)
+
+        self.assertEqual([p.name for p in self.tmpdir.iterdir()], ["test_1.npz"])
+        load_data(self.tmpdir / "test_1.npz")
+
+    def test_npz_dump_has_default_permissions(self):
+        reference = self.tmpdir / "reference"
+        reference.touch()
+
+        data = DataExample.create(data={"x": np.ones(3)})
+        for protocol in [1, 2]:
+            data.dump(self.tmpdir / f"test_{protocol}", protocol=protocol)
+            self.assertEqual(
+                (self.tmpdir / f"test_{protocol}.npz").stat().st_mode,
+                reference.stat().st_mode,
+            )
+
+    def test_npy_dump_has_default_permissions(self):
+        reference = self.tmpdir / "reference"
+        reference.mkdir()
+
+        data = DataExample.create(data={"x": np.ones(3)})
+        data.dump(self.tmpdir / "test_3", protocol=3)
+        self.assertEqual(
+            (self.tmpdir / "test_3").stat().st_mode, reference.stat().st_mode
+        )
+
+    def test_info_must_survive_json(self):
+        for info in [
+            {"a": (1, 2)},
+            {1: "a"},
+            {"a": np.ones(3)},
+            {"a": [object()]},
+        ]:
+            data = DataExample.create(data={"x": np.ones(3)}, info=info)
+            for protocol in [1, 2, 3]:
+                with self.assertRaises(ValueError):
+                    data.dump(self.tmpdir / "test_json", protocol=protocol)
+
+        info = {"a": [1, 2.0, "b", None, True], "b": {"c": np.float64(1.5)}}
+        data = DataExample.create(data={"x": np.ones(3)}, info=info)
+        for protocol in [1, 3]:
+            data.dump(self.tmpdir / f"test_json_{protocol}", protocol=protocol)
+            suffix = ".npz" if protocol == 1 else ""
+            data2 = load_data(self.tmpdir / f"test_json_{protocol}{suffix}")
+            self.assertEqual(data2.info, info)
+            self.assertIs(type(data2.info["b"]["c"]), float)
+
+    def test_object_arrays_are_refused(self):
+        ragged = np.empty(2, dtype=object)
+        ragged[0], ragged[1] = np.ones(2), np.ones(3)
+
+        data = DataExample.create(data={"x": ragged})
+        for protocol in [1, 2, 3]:
+            with self.assertRaises(ValueError):
+                data.dump(self.tmpdir / "test_object", protocol=protocol)
+
+    def test_load_legacy_npz(self):
+        # before protocol 1/2 stored metadata as json, it was pickled
+        data = DataExample.create(data={"asdf": np.random.random(10)}, info={"a": 1})
+        np.savez(
+            self.tmpdir / "legacy.npz",
+            **{
+                "kind": data.kind,
+                "info": data.info,
+                "meta": data.meta,
+                "protocol": 1,
+                "data/asdf": data.data["asdf"],
+            },
+        )
+
+        data2 = load_data(self.tmpdir / "legacy.npz")
+
+        np.testing.assert_array_equal(data.data["asdf"], data2.data["asdf"])
+        self.assertEqual(data.info, data2.info)
+        self.assertEqual(data.id, data2.id)
+
 
 class TestDataTracking(TestCase):
     def setUp(self):
@@ -9,6 +9,7 @@ from cmlkit.engine import (
     save_npy,
     safe_save_npy,
     read_npy,
+    read_npz,
     save_yaml,
     read_yaml,
     save_son,
@@ -43,6 +44,53 @@ class TestInout(TestCase):
 
         self.assertEqual(self.data, result)
 
+    def test_roundtrip_npy_arrays(self):
+        data = {"a": np.random.random((5, 3)), "b": np.arange(7), "c": "c"}
+        save_npy(self.tmpdir / "npytest", data)
+        result = read_npy(self.tmpdir / "npytest.npy")
+
+        self.assertEqual(set(result.keys()), set(data.keys()))
+        for k, v in data.items():
+            np.testing.assert_array_equal(result[k], v)
+
+        # files written by np.save directly are read the same way
+        np.save(self.tmpdir / "npytest_np", data)
+        self.assertEqual(read_npy(self.tmpdir / "npytest_np")["c"], "c")
+
+    def test_read_npz(self):
+        arrays = {"a": np.random.random((5, 3)), "b/c": np.arange(7)}
+
+        np.savez(self.tmpdir / "npztest.npz", **arrays)
+        result = read_npz(self.tmpdir / "npztest.npz")
+        self.assertEqual(set(result.keys()), set(arrays.keys()))
+        for k, v in arrays.items():
+            np.testing.assert_array_equal(result[k], v)
+
+        names = []
+        read_npz(self.tmpdir / "npztest.npz", allow_pickle=lambda n: names.extend(n))
+        self.assertEqual(sorted(names), ["a.npy", "b/c.npy"])
+
+        np.savez_compressed(self.tmpdir / "npztest_compressed.npz", **arrays)
+        result = read_npz(self.tmpdir / "npztest_compressed")
+        for k, v in arrays.items():
+            np.testing.assert_array_equal(result[k], v)
+
+    def test_read_npz_mmap(self):
+        arrays = {
+            "a": np.random.random((5, 3)),
+            "b": np.asfortranarray(np.random.random((4, 2))),
+            "c": np.zeros(0),
+        }
+
+        np.savez(self.tmpdir / "npztest.npz", **arrays)
+        result = read_npz(self.tmpdir / "npztest.npz", mmap_mode="r")
+        for k, v in arrays.items():
+            self.assertEqual(type(result[k]), np.ndarray)
+            np.testing.assert_array_equal(result[k], v)
+
+        self.assertIsInstance(result["a"].base, np.memmap)
+        self.assertFalse(result["a"].flags.writeable)
+
     def test_roundtrip_yaml(self):
         save_yaml(self.tmpdir / "npytest", self.data)
         result = read_yaml(self.tmpdir / "npytest.yml")
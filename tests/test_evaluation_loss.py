@@ -1,4 +1,5 @@
 from unittest import TestCase
+import warnings
 import numpy as np
 
 from cmlkit.evaluation.loss.lossfs import *
@@ -13,8 +14,8 @@ class TestLossfs(TestCase):
             true = np.random.random(100)
             pred = np.random.random(100)
 
-            self.assertEqual(rmse(true, pred), loss(true, pred, lossf="rmse"))
-            self.assertEqual(mae(true, pred), loss(true, pred, lossf="mae"))
+            np.testing.assert_almost_equal(rmse(true, pred), loss(true, pred, lossf="rmse"))
+            np.testing.assert_almost_equal(mae(true, pred), loss(true, pred, lossf="mae"))
             self.assertEqual(maxae(true, pred), loss(true, pred, lossf="maxae"))
             self.assertEqual(medianae(true, pred), loss(true, pred, lossf="medianae"))
             np.testing.assert_almost_equal(r2(true, pred), loss(true, pred, lossf="r2"))
@@ -27,6 +28,13 @@ class TestLossfs(TestCase):
             rmsle(true, pred), np.sqrt(np.mean(np.log((pred + 1) / (true + 1)) ** 2))
         )
 
+    def test_rmse_mae(self):
+        true = np.random.random(100)
+        pred = np.random.random(100)
+
+        np.testing.assert_almost_equal(rmse(true, pred), np.sqrt(np.mean((true - pred) ** 2)))
+        np.testing.assert_almost_equal(mae(true, pred), np.mean(np.fabs(true - pred)))
+
     def test_cod(self):
         true = np.random.random(100)
         pred = np.random.random(100)
@@ -52,6 +60,31 @@ class TestLoss(TestCase):
 
         self.assertEqual(rmse(true, pred), loss(true, pred)["rmse"])
 
+    def test_fused(self):
+        loss = get_loss("default")
+
+        true = np.random.random(100)
+        pred = np.random.random(100)
+
+        result = loss(true, pred)
+        self.assertEqual(result["rmse"], rmse(true, pred))
+        self.assertEqual(result["mae"], mae(true, pred))
+        self.assertEqual(result["r2"], r2(true, pred))
+        np.testing.assert_almost_equal(result["r2"], np.corrcoef(true, pred)[0, 1] ** 2)
+
+    def test_fused_only_requested(self):
+        loss = get_loss("rmse", "mae")
+
+        true = np.random.random(100)
+        pred = np.ones(100)  # r2 is undefined for constant predictions
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            result = loss(true, pred)
+
+        self.assertEqual(set(result.keys()), {"rmse", "mae"})
+        self.assertEqual(result["rmse"], rmse(true, pred))
+
     def test_shortcut(self):
         loss = get_loss("default")
 
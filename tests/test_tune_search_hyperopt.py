@@ -1,7 +1,7 @@
 import numpy as np
 from unittest import TestCase
 
-from cmlkit.tune.search.hyperopt import Hyperopt
+from cmlkit.tune.search.hyperopt import Hyperopt, make_grid
 
 
 def target(d):
@@ -260,3 +260,14 @@ class TestHyperoptTPE(TestCase):
         print(best_suggestion(tape))
 
         self.assertGreater(0.1, end)
+
+
+class TestMakeGrid(TestCase):
+    def test_grid_is_stable(self):
+        # grid values end up in evaluation ids, so they must never change
+        label, choices = make_grid("x", -3.0, 5.0, 17)
+
+        self.assertEqual(label, "x")
+        self.assertEqual(choices, [2.0 ** (-3.0 + 0.5 * i) for i in range(17)])
+        self.assertEqual(choices, np.logspace(-3.0, 5.0, num=17, base=2.0).tolist())
+        self.assertTrue(all(type(c) == float for c in choices))
@@ -1,3 +1,4 @@
+import numpy as np
 from unittest import TestCase
 from cmlkit.utility.indices import *
 
@@ -24,7 +25,7 @@ class TestFourwaySplit(TestCase):
         union = np.union1d(union, self.c)
         union = np.union1d(union, self.d)
 
-        self.assertEqual(union.all(), np.array(np.arange(self.n)).all())
+        np.testing.assert_array_equal(union, np.arange(self.n))
 
 
 class TestTwowaySplit(TestCase):
@@ -40,7 +41,7 @@ class TestTwowaySplit(TestCase):
     def test_union_is_all(self):
         union = np.union1d(self.a, self.b)
 
-        self.assertEqual(union.all(), np.array(np.arange(self.n)).all())
+        np.testing.assert_array_equal(union, np.arange(self.n))
 
 
 class TestThreewaySplit(TestCase):
@@ -58,17 +59,17 @@ class TestThreewaySplit(TestCase):
         union = np.union1d(self.a, self.b)
         union = np.union1d(union, self.c)
 
-        self.assertEqual(union.all(), np.array(np.arange(self.n)).all())
+        np.testing.assert_array_equal(union, np.arange(self.n))
 
 
 class TestGenerateIndices(TestCase):
     def test_make_range_if_int(self):
         ind = generate_indices(6, [])
-        self.assertEqual(ind.all(), np.arange(6).all())
+        np.testing.assert_array_equal(ind, np.arange(6))
 
     def test_pass_through_index_array(self):
         ind = generate_indices(np.arange(6), [])
-        self.assertEqual(ind.all(), np.arange(6).all())
+        np.testing.assert_array_equal(ind, np.arange(6))
 
     def test_exclude(self):
         ind = generate_indices(6, [3])
@@ -88,7 +89,7 @@ class TestGenerateDistinctSets(TestCase):
         full = np.arange(n)
         k = 3
         a, b = generate_distinct_sets(full, k)
-        self.assertEqual(np.union1d(a, b).all(), np.array(full).all())
+        np.testing.assert_array_equal(np.union1d(a, b), full)
 
     def test_set_disjunct(self):
         n = 78